@@ -0,0 +1,267 @@
+# audio_codecs.py
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+from config import TTS_CONFIG, TTS_CODECS
+
+# File suffix per output container
+CONTAINER_SUFFIXES = {
+    "mp3": ".mp3",
+    "wav": ".wav",
+    "ogg": ".ogg"
+}
+
+# Ogg page header: capture pattern, version, flags, granule position,
+# serial number, sequence number, checksum, segment count
+OGG_PAGE_HEADER = struct.Struct("<4sBBqIIIB")
+
+
+def get_codec(name: str) -> Dict[str, Any]:
+    """Look up a TTS codec by name"""
+    if name not in TTS_CODECS:
+        raise ValueError(f"Unknown TTS codec: {name}")
+    return TTS_CODECS[name]
+
+def get_codec_suffix(name: str) -> str:
+    """File suffix for the audio produced by a codec"""
+    return CONTAINER_SUFFIXES[get_codec(name)["container"]]
+
+def get_pcm_sample_rate(provider_format: str) -> int:
+    """Sample rate of an ElevenLabs PCM format such as pcm_24000"""
+    return int(provider_format.split("_")[1])
+
+def find_ffmpeg() -> Optional[str]:
+    """Path of the ffmpeg binary, or None if it is not installed"""
+    return shutil.which(TTS_CONFIG["ffmpeg_path"])
+
+def is_codec_available(name: str) -> bool:
+    """Whether a codec can be produced here (transcoded codecs need ffmpeg)"""
+    return "encoder" not in get_codec(name) or find_ffmpeg() is not None
+
+def get_available_codecs() -> List[str]:
+    """Names of the TTS codecs that can be produced here"""
+    return [name for name in TTS_CODECS if is_codec_available(name)]
+
+def validate_tts_config():
+    """Fail at startup if the default codec is unknown or cannot be produced"""
+    codec_name = TTS_CONFIG["codec"]
+    get_codec(codec_name)
+    if not is_codec_available(codec_name):
+        raise RuntimeError(f"TTS codec {codec_name} needs ffmpeg, which was not found")
+
+    unavailable = [name for name in TTS_CODECS if not is_codec_available(name)]
+    if unavailable:
+        print(f"⚠️ ffmpeg not found, disabled TTS codecs: {', '.join(unavailable)}")
+
+
+class AudioWriter(ABC):
+    """Streams provider audio chunks into a playable file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.first_audio_time = None  # perf_counter() when decodable audio first hit the file
+
+    @abstractmethod
+    def write(self, chunk: bytes):
+        """Encode and write one provider chunk"""
+
+    @abstractmethod
+    def close(self):
+        """Finish the file"""
+
+    @abstractmethod
+    def abort(self):
+        """Stop encoding and remove the partial file"""
+
+    def _mark_audio(self):
+        if self.first_audio_time is None:
+            self.first_audio_time = time.perf_counter()
+
+
+class OggAudioDetector:
+    """Finds the first Ogg page that carries audio.
+
+    The OpusHead/OpusTags header pages have a granule position of 0, so
+    the first page with a positive granule position is the first one a
+    player can decode audio from.
+    """
+
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data: bytes) -> bool:
+        """Add muxer output, return True once a complete audio page was seen"""
+        self.buffer += data
+        while len(self.buffer) >= OGG_PAGE_HEADER.size:
+            capture, _, _, granule, _, _, _, segments = OGG_PAGE_HEADER.unpack_from(self.buffer)
+            if capture != b"OggS":
+                raise ValueError("ffmpeg output is not an Ogg stream")
+            header_size = OGG_PAGE_HEADER.size + segments
+            if len(self.buffer) < header_size:
+                return False
+            page_size = header_size + sum(self.buffer[OGG_PAGE_HEADER.size:header_size])
+            if len(self.buffer) < page_size:
+                return False
+            if granule > 0:
+                return True
+            self.buffer = self.buffer[page_size:]
+        return False
+
+
+class PassthroughWriter(AudioWriter):
+    """Provider already emits the target codec, write chunks as they arrive"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.output = open(path, "wb")
+
+    def write(self, chunk: bytes):
+        self.output.write(chunk)
+        self._mark_audio()
+
+    def close(self):
+        self.output.close()
+
+    def abort(self):
+        self.output.close()
+        os.remove(self.path)
+
+
+class WavWriter(AudioWriter):
+    """Wraps raw 16-bit mono PCM in a WAV header so browsers can play it"""
+
+    def __init__(self, path: str, sample_rate: int):
+        super().__init__(path)
+        self.output = wave.open(path, "wb")
+        self.output.setnchannels(1)
+        self.output.setsampwidth(2)
+        self.output.setframerate(sample_rate)
+        self.pending = b""  # Chunks may split a sample in half
+
+    def write(self, chunk: bytes):
+        data = self.pending + chunk
+        usable = len(data) - len(data) % 2
+        self.pending = data[usable:]
+        if usable:
+            self.output.writeframes(data[:usable])
+            self._mark_audio()
+
+    def close(self):
+        # wave patches the header sizes on close
+        self.output.close()
+
+    def abort(self):
+        self.output.close()
+        os.remove(self.path)
+
+
+class FfmpegWriter(AudioWriter):
+    """Transcodes 16-bit mono PCM with ffmpeg for codecs the provider can't emit"""
+
+    def __init__(self, path: str, sample_rate: int, encoder: str, bitrate: str, container: str):
+        super().__init__(path)
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError(f"ffmpeg is required to encode {container} audio")
+
+        muxer_options = []
+        self.audio_detector = None
+        if container == "ogg":
+            # The Ogg muxer holds audio for up to a second per page by default
+            muxer_options = ["-page_duration", str(TTS_CONFIG["ogg_page_duration_ms"] * 1000)]
+            self.audio_detector = OggAudioDetector()
+
+        self.process = subprocess.Popen(
+            [
+                ffmpeg, "-loglevel", "error",
+                "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+                "-c:a", encoder, "-b:a", bitrate,
+                "-flush_packets", "1", *muxer_options, "-f", container, "pipe:1"
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            self.output = open(path, "wb")
+        except Exception:
+            self.process.kill()
+            self.process.wait()
+            raise
+
+        # Drain ffmpeg's output concurrently so neither pipe can fill up and block
+        self.drain_error = None
+        self.reader = threading.Thread(target=self._drain, daemon=True)
+        self.reader.start()
+
+    def _drain(self):
+        try:
+            while True:
+                data = os.read(self.process.stdout.fileno(), 65536)
+                if not data:
+                    break
+                self.output.write(data)
+                if self.first_audio_time is None and (
+                        self.audio_detector is None or self.audio_detector.feed(data)):
+                    self._mark_audio()
+        except Exception as e:
+            self.drain_error = e
+            # Nothing reads ffmpeg's output any more, stop it so write() can't block
+            self.process.kill()
+
+    def _raise_drain_error(self):
+        if self.drain_error is not None:
+            raise RuntimeError(f"Reading ffmpeg output failed: {self.drain_error}") from self.drain_error
+
+    def write(self, chunk: bytes):
+        self._raise_drain_error()
+        try:
+            self.process.stdin.write(chunk)
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            self.reader.join()
+            self._raise_drain_error()
+            raise
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        self.reader.join()
+        self.output.close()
+        self._raise_drain_error()
+        if self.process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode}")
+
+    def abort(self):
+        self.process.kill()
+        self.process.wait()
+        self.reader.join()
+        self.output.close()
+        os.remove(self.path)
+
+
+def open_audio_writer(codec_name: str, path: str) -> AudioWriter:
+    """Create the writer that turns a codec's provider stream into a playable file"""
+    codec = get_codec(codec_name)
+    provider_format = codec["provider_format"]
+
+    if "encoder" in codec:
+        return FfmpegWriter(
+            path,
+            get_pcm_sample_rate(provider_format),
+            codec["encoder"],
+            codec["bitrate"],
+            codec["container"]
+        )
+    if codec["container"] == "wav":
+        return WavWriter(path, get_pcm_sample_rate(provider_format))
+    return PassthroughWriter(path)
@@ -1,9 +1,13 @@
 # audio_services.py
+import os
 import requests
 import tempfile
+from typing import Optional
 from elevenlabs import VoiceSettings
 from elevenlabs.client import ElevenLabs
 from config import ELEVENLABS_API_KEY, HUGGINGFACE_API_KEY, VOICE_SETTINGS, TTS_CONFIG
+from audio_codecs import get_codec, get_codec_suffix, open_audio_writer
+from turn_control import Turn, TurnCancelled, check_turn
 
 # Initialize ElevenLabs client
 elevenlabs = ElevenLabs(api_key=ELEVENLABS_API_KEY)
@@ -36,33 +40,60 @@ def speech_to_text(audio_file_path: str) -> str:
         print(f"Speech to text error: {e}")
         return ""
 
-def text_to_speech(text: str) -> str:
-    """Convert text to speech and save as MP3 file"""
+def request_speech(text: str, output_format: str):
+    """Start an ElevenLabs synthesis and return its chunk stream"""
+    return elevenlabs.text_to_speech.convert(
+        voice_id=VOICE_SETTINGS["voice_id"],
+        output_format=output_format,
+        text=text,
+        model_id=TTS_CONFIG["model_id"],
+        voice_settings=VoiceSettings(
+            stability=VOICE_SETTINGS["stability"],
+            similarity_boost=VOICE_SETTINGS["similarity_boost"],
+            style=VOICE_SETTINGS["style"],
+            use_speaker_boost=VOICE_SETTINGS["use_speaker_boost"],
+            speed=VOICE_SETTINGS["speed"],
+        ),
+    )
+
+def text_to_speech(text: str, turn: Optional[Turn] = None, codec: Optional[str] = None) -> str:
+    """Convert text to speech and save it in the chosen codec (TTS_CODECS).
+
+    If ``turn`` is cancelled mid-stream, the ElevenLabs stream is closed,
+    the partial file is removed and TurnCancelled is raised.
+    """
+    codec = codec or TTS_CONFIG["codec"]
     try:
-        response = elevenlabs.text_to_speech.convert(
-            voice_id=VOICE_SETTINGS["voice_id"],
-            output_format=TTS_CONFIG["output_format"],
-            text=text,
-            model_id=TTS_CONFIG["model_id"],
-            voice_settings=VoiceSettings(
-                stability=VOICE_SETTINGS["stability"],
-                similarity_boost=VOICE_SETTINGS["similarity_boost"],
-                style=VOICE_SETTINGS["style"],
-                use_speaker_boost=VOICE_SETTINGS["use_speaker_boost"],
-                speed=VOICE_SETTINGS["speed"],
-            ),
-        )
-        
         # Create temporary file for audio
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=get_codec_suffix(codec))
+        temp_file.close()
+        
+        # Set up the encoder before paying for a provider request
+        try:
+            writer = open_audio_writer(codec, temp_file.name)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
         
-        with open(temp_file.name, "wb") as f:
+        # Chunks are encoded as they arrive, so playback-ready bytes land early
+        response = None
+        try:
+            response = request_speech(text, get_codec(codec)["provider_format"])
             for chunk in response:
+                check_turn(turn, "text_to_speech")
                 if chunk:
-                    f.write(chunk)
+                    writer.write(chunk)
+            writer.close()
+        except Exception:
+            if response is not None and hasattr(response, "close"):
+                response.close()
+            writer.abort()
+            raise
         
         return temp_file.name
         
+    except TurnCancelled:
+        raise
     except Exception as e:
         print(f"Text to speech error: {e}")
         return None
\ No newline at end of file
@@ -0,0 +1,99 @@
+# benchmark_tts_codecs.py
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from audio_services import request_speech
+from audio_codecs import get_codec, get_codec_suffix, get_pcm_sample_rate, get_available_codecs, open_audio_writer
+
+try:
+    import resource  # Child CPU time of ffmpeg, Unix only
+except ImportError:
+    resource = None
+
+SAMPLE_TEXT = "أهلاً وسهلاً فيك! شو حابب تطلب اليوم؟ عنا شاورما دجاج، فلافل، وعصير برتقال طازة."
+REFERENCE_FORMAT = "pcm_24000"
+
+
+def children_cpu_seconds() -> float:
+    """CPU time used by finished child processes (ffmpeg)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def measure_speech_seconds(text: str) -> float:
+    """Synthesize raw PCM once to get the spoken duration of the text"""
+    total_bytes = sum(len(chunk) for chunk in request_speech(text, REFERENCE_FORMAT))
+    return total_bytes / (2 * get_pcm_sample_rate(REFERENCE_FORMAT))
+
+def benchmark_codec(codec_name: str, text: str) -> dict:
+    """Run one synthesis through the same pipeline as text_to_speech and time it"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=get_codec_suffix(codec_name))
+    temp_file.close()
+
+    try:
+        cpu_before = children_cpu_seconds()
+        start = time.perf_counter()
+        encode_seconds = 0.0
+        encode_start = time.perf_counter()
+        writer = open_audio_writer(codec_name, temp_file.name)
+        encode_seconds += time.perf_counter() - encode_start
+
+        response = request_speech(text, get_codec(codec_name)["provider_format"])
+        for chunk in response:
+            if chunk:
+                encode_start = time.perf_counter()
+                writer.write(chunk)
+                encode_seconds += time.perf_counter() - encode_start
+        encode_start = time.perf_counter()
+        writer.close()
+        encode_seconds += time.perf_counter() - encode_start
+        total_seconds = time.perf_counter() - start
+
+        if writer.first_audio_time is None:
+            raise RuntimeError(f"{codec_name} produced no audio")
+        return {
+            "bytes": os.path.getsize(temp_file.name),
+            "first_audio_ms": (writer.first_audio_time - start) * 1000,
+            "encode_ms": encode_seconds * 1000,
+            "encoder_cpu_ms": (children_cpu_seconds() - cpu_before) * 1000,
+            "file_ready_ms": total_seconds * 1000
+        }
+    finally:
+        if os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+
+def main():
+    """Compare TTS codecs by payload size, encode cost and audio latency"""
+    parser = argparse.ArgumentParser(description="Benchmark TTS output codecs")
+    parser.add_argument("--text", default=SAMPLE_TEXT, help="Text to synthesize")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per codec (median is reported)")
+    parser.add_argument("--codecs", nargs="+", default=get_available_codecs(), help="Codecs to compare")
+    args = parser.parse_args()
+
+    speech_seconds = measure_speech_seconds(args.text)
+    print(f"🗣 Speech duration: {speech_seconds:.2f} s\n")
+    print("The UI receives the whole file, so callers hear audio after 'file ready ms'.")
+    print("'encoder first audio ms' is when the file first holds decodable audio (for Ogg,")
+    print("the first page past the Opus header pages); it is an encoder-side figure only.\n")
+    print(
+        f"{'codec':<12}{'bytes/s':>10}{'encoder first audio ms':>24}{'encode ms':>11}"
+        f"{'ffmpeg cpu ms':>15}{'file ready ms':>15}"
+    )
+
+    for codec_name in args.codecs:
+        runs = [benchmark_codec(codec_name, args.text) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(
+            f"{codec_name:<12}"
+            f"{median['bytes'] / speech_seconds:>10.0f}"
+            f"{median['first_audio_ms']:>24.0f}"
+            f"{median['encode_ms']:>11.1f}"
+            f"{median['encoder_cpu_ms']:>15.1f}"
+            f"{median['file_ready_ms']:>15.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,14 @@
 import re
 import datetime
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnableConfig
 from langchain_google_genai import ChatGoogleGenerativeAI
-from config import GOOGLE_API_KEY, LLM_CONFIG, BACKEND_URL
+from config import GOOGLE_API_KEY, LLM_CONFIG, BACKEND_URL, SESSION_STORE_CONFIG
+from session_store import get_session_store, StaleSessionError
+from turn_control import Turn, check_turn
 
 # Initialize LLM
 llm = ChatGoogleGenerativeAI(
@@ -55,9 +57,8 @@ IMPORTANT: When you include FUNCTION_CALL in your response, add it at the END af
     ("human", "{input}")
 ])
 
-# Global variables for session management
-user_histories = {}
-order_log = []
+# Shared session state so any worker process can serve any turn
+session_store = get_session_store()
 
 def extract_clean_response(full_response: str) -> str:
     """Extract the clean Arabic response without FUNCTION_CALL"""
@@ -90,21 +91,62 @@ def submit_order_to_backend(name: str, items: list) -> Dict[str, Any]:
     except Exception as e:
         return {"error": f"خطأ في الإرسال: {str(e)}"}
 
-def run_agent(user_id: str, user_input: str) -> Dict[str, Any]:
-    """Process user input through the Syrian Arabic assistant"""
-    if user_id not in user_histories:
-        user_histories[user_id] = []
-
-    history = user_histories[user_id]
-
-    result = (prompt | llm).invoke(
+def generate_reply(user_input: str, history: list, turn: Optional[Turn] = None) -> str:
+    """Generate the assistant reply for user_input given the conversation so far"""
+    # Stream so a cancelled turn stops generating instead of running to completion
+    chunks = (prompt | llm).stream(
         {"input": user_input, "chat_history": history},
         config=RunnableConfig()
     )
+    response_text = ""
+    try:
+        for chunk in chunks:
+            check_turn(turn, "llm")
+            response_text += chunk.content
+    finally:
+        chunks.close()
+    return response_text
+
+def save_history(user_id: str, history: list, version: int, turn: Optional[Turn] = None):
+    """Save history, raising TurnCancelled instead if a newer turn took over the session"""
+    try:
+        session_store.save(user_id, history, version, turn.turn_id if turn else None)
+    except StaleSessionError:
+        check_turn(turn, "history", force=True)
+        raise
 
-    response_text = result.content
-    history.append(HumanMessage(content=user_input))
-    history.append(AIMessage(content=response_text))
+def run_agent(user_id: str, user_input: str, turn: Optional[Turn] = None,
+              commit: bool = True) -> Dict[str, Any]:
+    """Process user input through the Syrian Arabic assistant.
+
+    If ``turn`` is cancelled by a newer input, the LLM stream is closed and
+    TurnCancelled is raised before anything is written to the history.
+    With ``commit=False`` a plain reply is not saved yet: the caller saves it
+    with commit_turn once it was delivered. Replies that submit an order are
+    always saved before the order is sent, so they are never rolled back.
+    """
+    # Optimistic concurrency: if another worker saved the session while the
+    # reply was generated, regenerate it against the newer history
+    for _ in range(SESSION_STORE_CONFIG["max_save_retries"]):
+        history, version = session_store.load(user_id)
+        response_text = generate_reply(user_input, history, turn)
+        check_turn(turn, "history")
+
+        history = history + [
+            HumanMessage(content=user_input),
+            AIMessage(content=response_text)
+        ]
+        if not commit and "FUNCTION_CALL:" not in response_text:
+            pending_history = {"history": history, "version": version}
+            break
+        try:
+            save_history(user_id, history, version, turn)
+            pending_history = None
+            break
+        except StaleSessionError:
+            continue
+    else:
+        raise StaleSessionError(f"Could not save turn for session {user_id}")
 
     clean_response = extract_clean_response(response_text)
 
@@ -137,7 +179,7 @@ def run_agent(user_id: str, user_input: str) -> Dict[str, Any]:
                     "eta_minutes": backend_response.get("eta_minutes"),
                     "backend_response": backend_response
                 }
-                order_log.append(order_info)
+                session_store.append_order(order_info)
                 
                 return {
                     "function_call": True, 
@@ -154,15 +196,31 @@ def run_agent(user_id: str, user_input: str) -> Dict[str, Any]:
         except Exception as e:
             return {"response": response_text, "clean_response": clean_response, "error": str(e)}
 
-    return {"response": response_text, "clean_response": clean_response, "function_call": False}
+    return {
+        "response": response_text,
+        "clean_response": clean_response,
+        "function_call": False,
+        "pending_history": pending_history
+    }
+
+def commit_turn(user_id: str, agent_response: Dict[str, Any], turn: Optional[Turn] = None):
+    """Save a reply that run_agent(commit=False) left pending, once it was delivered.
+
+    Raises TurnCancelled if a newer turn took over the session, or
+    StaleSessionError if the session changed otherwise (e.g. it was cleared).
+    """
+    pending_history = agent_response.get("pending_history")
+    if pending_history:
+        check_turn(turn, "history")
+        save_history(user_id, pending_history["history"], pending_history["version"], turn)
 
 def clear_conversation(user_id: str = "default_user"):
     """Clear conversation history for a user"""
-    if user_id in user_histories:
-        user_histories[user_id] = []
+    session_store.clear(user_id)
 
 def get_order_history() -> str:
     """Get formatted order history"""
+    order_log = session_store.get_orders()
     if not order_log:
         return "📋 لا توجد طلبات حتى الآن"
     
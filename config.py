@@ -32,13 +32,41 @@ LLM_CONFIG = {
 
 # TTS Configuration
 TTS_CONFIG = {
-    "output_format": "mp3_22050_32",
-    "model_id": "eleven_turbo_v2_5"
+    "codec": os.getenv("TTS_CODEC", "mp3_32"),  # Default entry of TTS_CODECS
+    "model_id": "eleven_turbo_v2_5",
+    "ffmpeg_path": os.getenv("FFMPEG_PATH", "ffmpeg"),
+    "ogg_page_duration_ms": 100  # Longest audio the Ogg muxer buffers before writing a page
+}
+
+# TTS output codecs. "provider_format" is requested from ElevenLabs; codecs with
+# an "encoder" are transcoded locally with ffmpeg, PCM is wrapped in a WAV header.
+TTS_CODECS = {
+    "mp3_32": {"label": "MP3 32 kbps", "provider_format": "mp3_22050_32", "container": "mp3"},
+    "mp3_64": {"label": "MP3 64 kbps", "provider_format": "mp3_44100_64", "container": "mp3"},
+    "mp3_128": {"label": "MP3 128 kbps", "provider_format": "mp3_44100_128", "container": "mp3"},
+    "pcm_16000": {"label": "PCM 16 kHz", "provider_format": "pcm_16000", "container": "wav"},
+    "pcm_24000": {"label": "PCM 24 kHz", "provider_format": "pcm_24000", "container": "wav"},
+    "opus_16": {"label": "Opus 16 kbps", "provider_format": "pcm_24000", "container": "ogg",
+                "encoder": "libopus", "bitrate": "16k"},
+    "opus_32": {"label": "Opus 32 kbps", "provider_format": "pcm_24000", "container": "ogg",
+                "encoder": "libopus", "bitrate": "32k"}
+}
+
+# Session Store Configuration
+SESSION_STORE_CONFIG = {
+    "backend": os.getenv("SESSION_STORE_BACKEND", "sqlite"),  # "sqlite" or "redis"
+    "sqlite_path": os.getenv("SESSION_STORE_PATH", "sessions.db"),
+    "redis_url": os.getenv("SESSION_STORE_REDIS_URL", "redis://localhost:6379/0"),
+    "key_prefix": "voice_agent:",
+    "lock_timeout": 10,  # Seconds to wait for a locked SQLite file
+    "max_save_retries": 3,  # Replies regenerated when another worker saved the session first
+    "turn_poll_interval": 0.25  # Seconds between checks for a barge-in handled by another worker
 }
 
 # Gradio Configuration
 GRADIO_CONFIG = {
     "share": True,
     "debug": True,
-    "server_port": 7860
+    "server_port": 7860,
+    "concurrency_limit": 4  # Agent turns processed at once across all clients
 }
@@ -1,31 +1,55 @@
 # gradio_interface.py
 import gradio as gr
-from typing import Tuple
+from typing import Tuple, Optional
 from audio_services import speech_to_text, text_to_speech
-from chat_agent import run_agent, clear_conversation, get_order_history, get_backend_orders
+from chat_agent import run_agent, commit_turn, clear_conversation, get_order_history, get_backend_orders
+from turn_control import TurnCancelled, start_turn, interrupt_turn, finish_turn, check_turn, get_cancel_report
+from audio_codecs import get_available_codecs
+from config import TTS_CONFIG, TTS_CODECS, GRADIO_CONFIG
 
-def process_voice_input(audio_file, user_id: str = "default_user") -> Tuple[str, str, str]:
+def get_session_id(request: Optional[gr.Request]) -> str:
+    """Per-browser session id, falling back to a shared id outside Gradio"""
+    if request is None or not request.session_hash:
+        return "default_user"
+    return request.session_hash
+
+def interrupt_session_turn(new_input, request: gr.Request = None):
+    """Barge-in: cancel the session's in-flight turn as soon as a new input arrives"""
+    # An empty submit is rejected by the handler, so it must not cut off the current reply
+    if isinstance(new_input, str):
+        new_input = new_input.strip()
+    if new_input:
+        interrupt_turn(get_session_id(request))
+
+def process_voice_input(audio_file, codec: str = TTS_CONFIG["codec"], request: gr.Request = None) -> Tuple[str, str, str]:
     """Process voice input and return conversation history, status, and audio response"""
+    user_id = get_session_id(request)
     
     if audio_file is None:
         return "", "❌ لم يتم رفع ملف صوتي", None
     
+    # A new input cancels whatever this session's previous turn is still doing
+    turn = start_turn(user_id)
     try:
         # Convert speech to text
         user_text = speech_to_text(audio_file)
+        check_turn(turn, "speech_to_text")
         
         if not user_text:
             return "", "❌ لم أتمكن من فهم الصوت، حاول مرة أخرى", None
         
         # Process through agent
-        agent_response = run_agent(user_id, user_text)
+        agent_response = run_agent(user_id, user_text, turn, commit=False)
         
         if "error" in agent_response:
             return "", f"❌ خطأ: {agent_response['error']}", None
         
         # Generate audio response
         response_for_audio = agent_response["clean_response"]
-        audio_file_path = text_to_speech(response_for_audio)
+        audio_file_path = text_to_speech(response_for_audio, turn, codec)
+        
+        # The reply is added to the history unless the turn was cancelled
+        commit_turn(user_id, agent_response, turn)
         
         # Build conversation display
         conversation = f"👤 **أنت:** {user_text}\n\n🤖 **المساعد:** {response_for_audio}\n\n"
@@ -47,25 +71,36 @@ def process_voice_input(audio_file, user_id: str = "default_user") -> Tuple[str,
         
         return conversation, status, audio_file_path
         
+    except TurnCancelled:
+        # Superseded by a newer turn, leave the UI to that turn
+        return gr.update(), gr.update(), gr.update()
     except Exception as e:
         return "", f"❌ خطأ في معالجة الصوت: {str(e)}", None
+    finally:
+        finish_turn(turn)
 
-def process_text_input(text_input: str, conversation_history: str, user_id: str = "default_user") -> Tuple[str, str, str]:
+def process_text_input(text_input: str, conversation_history: str, codec: str = TTS_CONFIG["codec"], request: gr.Request = None) -> Tuple[str, str, str]:
     """Process text input and return updated conversation, status, and audio response"""
+    user_id = get_session_id(request)
     
     if not text_input.strip():
         return conversation_history, "❌ الرجاء كتابة رسالة", None
     
+    # A new input cancels whatever this session's previous turn is still doing
+    turn = start_turn(user_id)
     try:
         # Process through agent
-        agent_response = run_agent(user_id, text_input)
+        agent_response = run_agent(user_id, text_input, turn, commit=False)
         
         if "error" in agent_response:
             return conversation_history, f"❌ خطأ: {agent_response['error']}", None
         
         # Generate audio response
         response_for_audio = agent_response["clean_response"]
-        audio_file_path = text_to_speech(response_for_audio)
+        audio_file_path = text_to_speech(response_for_audio, turn, codec)
+        
+        # The reply is added to the history unless the turn was cancelled
+        commit_turn(user_id, agent_response, turn)
         
         # Update conversation display
         new_conversation = f"👤 **أنت:** {text_input}\n\n🤖 **المساعد:** {response_for_audio}\n\n"
@@ -88,12 +123,18 @@ def process_text_input(text_input: str, conversation_history: str, user_id: str
         
         return updated_conversation, status, audio_file_path
         
+    except TurnCancelled:
+        # Superseded by a newer turn, leave the UI to that turn
+        return gr.update(), gr.update(), gr.update()
     except Exception as e:
         return conversation_history, f"❌ خطأ في معالجة النص: {str(e)}", None
+    finally:
+        finish_turn(turn)
 
-def clear_conversation_ui() -> Tuple[str, str]:
+def clear_conversation_ui(request: gr.Request = None) -> Tuple[str, str]:
     """Clear conversation history"""
-    user_id = "default_user"
+    user_id = get_session_id(request)
+    interrupt_turn(user_id)
     clear_conversation(user_id)
     return "", "🔄 تم مسح المحادثة"
 
@@ -169,10 +210,16 @@ def create_gradio_interface():
                 
                 # Controls
                 gr.Markdown("## ⚙️ التحكم")
+                codec_select = gr.Dropdown(
+                    choices=[(TTS_CODECS[name]["label"], name) for name in get_available_codecs()],
+                    value=TTS_CONFIG["codec"],
+                    label="🎧 صيغة الصوت"
+                )
                 with gr.Row():
                     clear_btn = gr.Button("🗑️ مسح المحادثة", variant="stop")
                     orders_btn = gr.Button("📋 عرض الطلبات المحلية", variant="secondary")
                     backend_orders_btn = gr.Button("🗄️ طلبات النظام", variant="secondary")
+                    cancel_stats_btn = gr.Button("📊 إحصائيات المقاطعة", variant="secondary")
             
             with gr.Column(scale=3):
                 # Conversation Display
@@ -205,16 +252,32 @@ def create_gradio_interface():
                 )
         
         # Event handlers
+        # Each input first cancels the session's previous turn outside the queue,
+        # so a barge-in takes effect even while the turn waits for a free slot
         voice_submit.click(
-            fn=process_voice_input,
+            fn=interrupt_session_turn,
             inputs=[voice_input],
-            outputs=[conversation_display, status_display, audio_output]
+            queue=False,
+            trigger_mode="multiple"
+        ).then(
+            fn=process_voice_input,
+            inputs=[voice_input, codec_select],
+            outputs=[conversation_display, status_display, audio_output],
+            concurrency_id="agent_turn",
+            concurrency_limit=GRADIO_CONFIG["concurrency_limit"]
         )
         
         text_submit.click(
+            fn=interrupt_session_turn,
+            inputs=[text_input],
+            queue=False,
+            trigger_mode="multiple"
+        ).then(
             fn=process_text_input,
-            inputs=[text_input, conversation_display],
-            outputs=[conversation_display, status_display, audio_output]
+            inputs=[text_input, conversation_display, codec_select],
+            outputs=[conversation_display, status_display, audio_output],
+            concurrency_id="agent_turn",
+            concurrency_limit=GRADIO_CONFIG["concurrency_limit"]
         ).then(
             fn=lambda: "",  # Clear text input after submit
             outputs=[text_input]
@@ -222,9 +285,16 @@ def create_gradio_interface():
         
         # Enter key support for text input
         text_input.submit(
+            fn=interrupt_session_turn,
+            inputs=[text_input],
+            queue=False,
+            trigger_mode="multiple"
+        ).then(
             fn=process_text_input,
-            inputs=[text_input, conversation_display],
-            outputs=[conversation_display, status_display, audio_output]
+            inputs=[text_input, conversation_display, codec_select],
+            outputs=[conversation_display, status_display, audio_output],
+            concurrency_id="agent_turn",
+            concurrency_limit=GRADIO_CONFIG["concurrency_limit"]
         ).then(
             fn=lambda: "",
             outputs=[text_input]
@@ -250,5 +320,13 @@ def create_gradio_interface():
             fn=lambda: gr.update(visible=True),
             outputs=[order_history_display]
         )
+        
+        cancel_stats_btn.click(
+            fn=get_cancel_report,
+            outputs=[order_history_display]
+        ).then(
+            fn=lambda: gr.update(visible=True),
+            outputs=[order_history_display]
+        )
     
     return demo
\ No newline at end of file
@@ -3,6 +3,7 @@ import threading
 import time
 from backend_api import run_backend
 from gradio_interface import create_gradio_interface
+from audio_codecs import validate_tts_config
 from config import BACKEND_PORT, GRADIO_CONFIG
 
 def start_backend():
@@ -22,6 +23,9 @@ def main():
     print("   GET  /orders - Get all orders")
     print("   GET  /orders/<id> - Get specific order")
     
+    # Fail now rather than on every turn if TTS_CODEC or ffmpeg is wrong
+    validate_tts_config()
+    
     # Start backend API
     backend_thread = start_backend()
     
@@ -0,0 +1,307 @@
+# session_store.py
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Tuple, Dict, Any, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from config import SESSION_STORE_CONFIG
+
+try:
+    import redis
+    from redis.exceptions import WatchError
+except ImportError:  # Redis backend is optional
+    redis = None
+
+    class WatchError(Exception):
+        """Placeholder so RedisSessionStore works with a stand-in client"""
+
+# Compact one-letter tags for serialized message types. Subclasses such as
+# AIMessageChunk are stored as their base type.
+MESSAGE_TYPES = {
+    "h": HumanMessage,
+    "a": AIMessage,
+    "s": SystemMessage
+}
+
+
+class StaleSessionError(Exception):
+    """Raised when a session was saved by another worker after it was loaded"""
+
+
+def get_message_tag(message: BaseMessage) -> str:
+    """Tag for a message in serialized history"""
+    for tag, message_type in MESSAGE_TYPES.items():
+        if isinstance(message, message_type):
+            return tag
+    raise ValueError(f"Unsupported message type in session history: {type(message).__name__}")
+
+def serialize_history(history: List[BaseMessage]) -> str:
+    """Serialize a LangChain message history as compact JSON pairs"""
+    return json.dumps(
+        [[get_message_tag(message), message.content] for message in history],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+
+def deserialize_history(data: str) -> List[BaseMessage]:
+    """Rebuild a LangChain message history from serialize_history output"""
+    if not data:
+        return []
+    return [MESSAGE_TYPES[tag](content=content) for tag, content in json.loads(data)]
+
+
+class SessionStore(ABC):
+    """Shared conversation state so any worker process can serve any turn.
+
+    Every session carries a version number. ``load`` returns the history
+    together with its version, and ``save`` only succeeds if the stored
+    version still matches, otherwise it raises ``StaleSessionError``.
+    Sessions also record the id of their active turn, so a worker can tell
+    that its turn was superseded by a newer input handled elsewhere.
+    """
+
+    @abstractmethod
+    def load(self, user_id: str) -> Tuple[List[BaseMessage], int]:
+        """Return (history, version) for a user; unknown users get ([], 0)"""
+
+    @abstractmethod
+    def save(self, user_id: str, history: List[BaseMessage], version: int,
+             turn_id: Optional[str] = None) -> int:
+        """Store history if the session is still at version (and turn_id is still
+        the active turn, when given), return the new version"""
+
+    @abstractmethod
+    def clear(self, user_id: str):
+        """Reset a user's history unconditionally"""
+
+    @abstractmethod
+    def set_active_turn(self, user_id: str, turn_id: Optional[str]):
+        """Record the turn now in charge of a session; None means no turn"""
+
+    @abstractmethod
+    def get_active_turn(self, user_id: str) -> Optional[str]:
+        """Return the id of the session's active turn"""
+
+    @abstractmethod
+    def append_order(self, order: Dict[str, Any]):
+        """Append an order to the shared order log"""
+
+    @abstractmethod
+    def get_orders(self) -> List[Dict[str, Any]]:
+        """Return the shared order log, oldest first"""
+
+    @abstractmethod
+    def increment_counter(self, name: str, amount: int = 1):
+        """Add to a counter shared by all workers"""
+
+    @abstractmethod
+    def get_counters(self) -> Dict[str, int]:
+        """Return every shared counter"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store backed by a SQLite file shared by workers on one host"""
+
+    def __init__(self, path: str = SESSION_STORE_CONFIG["sqlite_path"]):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "user_id TEXT PRIMARY KEY, history TEXT NOT NULL, version INTEGER NOT NULL, "
+                "turn_id TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS orders ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A fresh connection per call keeps the store safe across threads
+        conn = sqlite3.connect(self.path, timeout=SESSION_STORE_CONFIG["lock_timeout"])
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, user_id: str) -> Tuple[List[BaseMessage], int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT history, version FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return [], 0
+        return deserialize_history(row[0]), row[1]
+
+    def save(self, user_id: str, history: List[BaseMessage], version: int,
+             turn_id: Optional[str] = None) -> int:
+        data = serialize_history(history)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE sessions SET history = ?, version = version + 1 "
+                "WHERE user_id = ? AND version = ? AND (? IS NULL OR turn_id = ?)",
+                (data, user_id, version, turn_id, turn_id)
+            )
+            if cursor.rowcount == 0 and version == 0 and turn_id is None:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO sessions (user_id, history, version) VALUES (?, ?, 1)",
+                    (user_id, data)
+                )
+        if cursor.rowcount != 1:
+            raise StaleSessionError(f"Session {user_id} changed since version {version}")
+        return version + 1
+
+    def clear(self, user_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (user_id, history, version) VALUES (?, '[]', 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET history = '[]', version = version + 1",
+                (user_id,)
+            )
+
+    def set_active_turn(self, user_id: str, turn_id: Optional[str]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (user_id, history, version, turn_id) VALUES (?, '[]', 0, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET turn_id = excluded.turn_id",
+                (user_id, turn_id)
+            )
+
+    def get_active_turn(self, user_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT turn_id FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def append_order(self, order: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO orders (data) VALUES (?)",
+                (json.dumps(order, ensure_ascii=False),)
+            )
+
+    def get_orders(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM orders ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def increment_counter(self, name: str, amount: int = 1):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+
+    def get_counters(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, value FROM counters").fetchall()
+        return dict(rows)
+
+
+class RedisSessionStore(SessionStore):
+    """Session store backed by Redis (or any client speaking the redis-py API)"""
+
+    def __init__(self, url: str = SESSION_STORE_CONFIG["redis_url"], client=None,
+                 prefix: str = SESSION_STORE_CONFIG["key_prefix"]):
+        if client is None:
+            if redis is None:
+                raise ImportError("The redis package is required for the Redis session store")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _session_key(self, user_id: str) -> str:
+        return f"{self.prefix}session:{user_id}"
+
+    def _orders_key(self) -> str:
+        return f"{self.prefix}orders"
+
+    def _counters_key(self) -> str:
+        return f"{self.prefix}counters"
+
+    def load(self, user_id: str) -> Tuple[List[BaseMessage], int]:
+        history, version = self.client.hmget(self._session_key(user_id), "history", "version")
+        if version is None:
+            return [], 0
+        return deserialize_history(decode(history)), int(version)
+
+    def save(self, user_id: str, history: List[BaseMessage], version: int,
+             turn_id: Optional[str] = None) -> int:
+        key = self._session_key(user_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current_version, current_turn = pipe.hmget(key, "version", "turn")
+                if int(current_version or 0) != version or (
+                        turn_id is not None and decode(current_turn) != turn_id):
+                    raise StaleSessionError(f"Session {user_id} changed since version {version}")
+                pipe.multi()
+                pipe.hset(key, mapping={"history": serialize_history(history), "version": version + 1})
+                pipe.execute()
+            except WatchError:
+                raise StaleSessionError(f"Session {user_id} changed since version {version}")
+        return version + 1
+
+    def clear(self, user_id: str):
+        key = self._session_key(user_id)
+        with self.client.pipeline() as pipe:
+            pipe.hset(key, "history", "[]")
+            pipe.hincrby(key, "version", 1)
+            pipe.execute()
+
+    def set_active_turn(self, user_id: str, turn_id: Optional[str]):
+        if turn_id is None:
+            self.client.hdel(self._session_key(user_id), "turn")
+        else:
+            self.client.hset(self._session_key(user_id), "turn", turn_id)
+
+    def get_active_turn(self, user_id: str) -> Optional[str]:
+        return decode(self.client.hget(self._session_key(user_id), "turn"))
+
+    def append_order(self, order: Dict[str, Any]):
+        self.client.rpush(self._orders_key(), json.dumps(order, ensure_ascii=False))
+
+    def get_orders(self) -> List[Dict[str, Any]]:
+        return [json.loads(data) for data in self.client.lrange(self._orders_key(), 0, -1)]
+
+    def increment_counter(self, name: str, amount: int = 1):
+        self.client.hincrby(self._counters_key(), name, amount)
+
+    def get_counters(self) -> Dict[str, int]:
+        counters = self.client.hgetall(self._counters_key())
+        return {decode(name): int(value) for name, value in counters.items()}
+
+
+def decode(value):
+    """Decode a Redis reply, which is bytes unless the client sets decode_responses"""
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+def create_session_store() -> SessionStore:
+    """Create the session store selected in SESSION_STORE_CONFIG"""
+    backend = SESSION_STORE_CONFIG["backend"]
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+# Store shared by the modules of this worker process, created on first use
+session_store = None
+
+def get_session_store() -> SessionStore:
+    """Return this process's session store"""
+    global session_store
+    if session_store is None:
+        session_store = create_session_store()
+    return session_store
@@ -0,0 +1,10 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the store created when chat_agent is imported out of the repository
+os.environ.setdefault("SESSION_STORE_PATH", os.path.join(tempfile.mkdtemp(), "sessions.db"))
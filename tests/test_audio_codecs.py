@@ -0,0 +1,96 @@
+# tests/test_audio_codecs.py
+import math
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import wave
+import pytest
+import audio_codecs
+from audio_codecs import OggAudioDetector, OGG_PAGE_HEADER, open_audio_writer, validate_tts_config
+
+
+def ogg_page(granule: int, payload: bytes) -> bytes:
+    """Build an Ogg page with a single segment (CRC is not checked)"""
+    return OGG_PAGE_HEADER.pack(b"OggS", 0, 0, granule, 1, 0, 0, 1) + bytes([len(payload)]) + payload
+
+
+def sine_pcm(seconds: float, sample_rate: int = 24000) -> bytes:
+    """16-bit mono PCM of a 440 Hz tone"""
+    samples = int(seconds * sample_rate)
+    return struct.pack(
+        f"<{samples}h",
+        *(int(8000 * math.sin(2 * math.pi * 440 * i / sample_rate)) for i in range(samples))
+    )
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_opus_round_trip(tmp_path):
+    path = str(tmp_path / "out.ogg")
+    writer = open_audio_writer("opus_16", path)
+    pcm = sine_pcm(1.0)
+    for offset in range(0, len(pcm), 4096):
+        writer.write(pcm[offset:offset + 4096])
+    writer.close()
+
+    with open(path, "rb") as f:
+        encoded = f.read()
+    assert encoded.startswith(b"OggS") and b"OpusHead" in encoded
+    assert len(encoded) < len(pcm) / 10
+    assert writer.first_audio_time is not None
+
+    decoded = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", path, "-f", "s16le", "-ar", "24000", "-ac", "1", "pipe:1"],
+        capture_output=True, check=True
+    ).stdout
+    assert abs(len(decoded) - len(pcm)) < 0.05 * len(pcm)
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as a fake ffmpeg")
+def test_ffmpeg_output_error_surfaces_instead_of_hanging(monkeypatch, tmp_path):
+    # A fake ffmpeg that echoes raw PCM back, which is not an Ogg stream
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    fake_ffmpeg.write_text("#!/bin/sh\nexec cat\n")
+    fake_ffmpeg.chmod(0o755)
+    monkeypatch.setattr(audio_codecs, "find_ffmpeg", lambda: str(fake_ffmpeg))
+
+    path = str(tmp_path / "out.ogg")
+    writer = open_audio_writer("opus_16", path)
+    with pytest.raises(RuntimeError, match="not an Ogg stream"):
+        for _ in range(1000):
+            writer.write(b"\x00" * 4096)
+        writer.close()
+    writer.abort()
+    assert not os.path.exists(path)
+
+def test_wav_writer_handles_split_samples(tmp_path):
+    path = str(tmp_path / "out.wav")
+    writer = open_audio_writer("pcm_24000", path)
+    for chunk in [b"\x01", b"\x02\x03\x04\x05", b"\x06"]:
+        writer.write(chunk)
+    writer.close()
+
+    with wave.open(path) as result:
+        assert result.getframerate() == 24000
+        assert result.readframes(10) == b"\x01\x02\x03\x04\x05\x06"
+    assert writer.first_audio_time is not None
+
+def test_ogg_header_pages_are_not_audio():
+    detector = OggAudioDetector()
+    assert not detector.feed(ogg_page(0, b"OpusHead"))
+    assert not detector.feed(ogg_page(0, b"OpusTags"))
+    audio_page = ogg_page(960, b"audio")
+    assert not detector.feed(audio_page[:10])
+    assert detector.feed(audio_page[10:])
+
+def test_unknown_default_codec_fails_validation(monkeypatch):
+    monkeypatch.setitem(audio_codecs.TTS_CONFIG, "codec", "wav_9000")
+    with pytest.raises(ValueError):
+        validate_tts_config()
+
+def test_transcoded_default_codec_needs_ffmpeg(monkeypatch):
+    monkeypatch.setitem(audio_codecs.TTS_CONFIG, "codec", "opus_16")
+    monkeypatch.setattr(audio_codecs, "find_ffmpeg", lambda: None)
+    with pytest.raises(RuntimeError, match="ffmpeg"):
+        validate_tts_config()
+    assert "opus_16" not in audio_codecs.get_available_codecs()
@@ -0,0 +1,63 @@
+# tests/test_audio_services.py
+import os
+import tempfile
+import pytest
+import audio_services
+import turn_control
+from session_store import SQLiteSessionStore
+from turn_control import TurnCancelled, start_turn
+
+
+class FakeSpeechStream:
+    """Stands in for the ElevenLabs chunk stream"""
+
+    def __init__(self, chunks, on_chunk=None):
+        self.chunks = chunks
+        self.on_chunk = on_chunk
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield chunk
+            if self.on_chunk:
+                self.on_chunk()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(monkeypatch, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(turn_control, "get_session_store", lambda: store)
+    monkeypatch.setattr(turn_control, "active_turns", {})
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(audio_dir))
+    return audio_dir
+
+
+def test_speech_is_written_in_chosen_codec(monkeypatch, temp_dir):
+    stream = FakeSpeechStream([b"\x00\x01" * 50, b"\x02\x03" * 50])
+    formats = []
+
+    def request_speech(text, output_format):
+        formats.append(output_format)
+        return stream
+
+    monkeypatch.setattr(audio_services, "request_speech", request_speech)
+    path = audio_services.text_to_speech("مرحبا", codec="pcm_16000")
+
+    assert formats == ["pcm_16000"]
+    assert path.endswith(".wav")
+    assert os.path.getsize(path) == 44 + 200
+
+def test_cancelled_speech_closes_stream_and_removes_file(monkeypatch, temp_dir):
+    turn = start_turn("u")
+    stream = FakeSpeechStream([b"chunk-1", b"chunk-2", b"chunk-3"], on_chunk=turn.cancel)
+    monkeypatch.setattr(audio_services, "request_speech", lambda text, output_format: stream)
+
+    with pytest.raises(TurnCancelled):
+        audio_services.text_to_speech("مرحبا", turn, "mp3_32")
+    assert stream.closed
+    assert os.listdir(temp_dir) == []
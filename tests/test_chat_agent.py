@@ -0,0 +1,139 @@
+# tests/test_chat_agent.py
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import HumanMessage, AIMessage
+import chat_agent
+import turn_control
+from config import SESSION_STORE_CONFIG
+from session_store import SQLiteSessionStore, StaleSessionError
+from turn_control import TurnCancelled, start_turn
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(chat_agent, "session_store", store)
+    monkeypatch.setattr(turn_control, "get_session_store", lambda: store)
+    monkeypatch.setattr(turn_control, "active_turns", {})
+    return store
+
+def use_replies(monkeypatch, *replies):
+    """Replace Gemini with a fake model that streams the given replies in order"""
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+    monkeypatch.setattr(chat_agent, "llm", model)
+
+def race_other_worker(monkeypatch, store, races: int):
+    """Have another worker save the session right after each of the first replies"""
+    seen_histories = []
+    generate_reply = chat_agent.generate_reply
+
+    def racing_generate_reply(user_input, history, turn=None):
+        seen_histories.append([message.content for message in history])
+        reply = generate_reply(user_input, history, turn)
+        if len(seen_histories) <= races:
+            other_history, version = store.load("u")
+            store.save("u", other_history + [
+                HumanMessage(content=f"other {len(seen_histories)}"),
+                AIMessage(content="other reply")
+            ], version)
+        return reply
+
+    monkeypatch.setattr(chat_agent, "generate_reply", racing_generate_reply)
+    return seen_histories
+
+
+def test_reply_is_saved(monkeypatch, store):
+    use_replies(monkeypatch, "أهلا وسهلا")
+    result = chat_agent.run_agent("u", "مرحبا")
+
+    history, version = store.load("u")
+    assert [message.content for message in history] == ["مرحبا", "أهلا وسهلا"]
+    assert version == 1
+    assert result["clean_response"] == "أهلا وسهلا"
+
+def test_conflict_regenerates_against_reloaded_history(monkeypatch, store):
+    use_replies(monkeypatch, "stale reply", "fresh reply")
+    seen_histories = race_other_worker(monkeypatch, store, races=1)
+
+    result = chat_agent.run_agent("u", "hello")
+
+    assert seen_histories == [[], ["other 1", "other reply"]]
+    history, _ = store.load("u")
+    assert [message.content for message in history] == ["other 1", "other reply", "hello", "fresh reply"]
+    assert result["clean_response"] == "fresh reply"
+
+def test_conflict_on_every_attempt_fails_the_turn(monkeypatch, store):
+    retries = SESSION_STORE_CONFIG["max_save_retries"]
+    use_replies(monkeypatch, *[f"reply {i}" for i in range(retries)])
+    seen_histories = race_other_worker(monkeypatch, store, races=retries)
+
+    with pytest.raises(StaleSessionError):
+        chat_agent.run_agent("u", "hello")
+    assert len(seen_histories) == retries
+    assert all(message.content != "hello" for message in store.load("u")[0])
+
+def test_order_reply_is_saved_before_submitting(monkeypatch, store):
+    use_replies(monkeypatch, 'تمام FUNCTION_CALL: submit_order(name="أحمد", items=["فلافل"])')
+    saved_at_submit = []
+
+    def submit_order(name, items):
+        saved_at_submit.append(len(store.load("u")[0]))
+        return {"order_id": "ORD-1", "eta_minutes": 15}
+
+    monkeypatch.setattr(chat_agent, "submit_order_to_backend", submit_order)
+    result = chat_agent.run_agent("u", "أكد الطلب", commit=False)
+
+    assert saved_at_submit == [2]
+    assert result["function_call"] and result["order_id"] == "ORD-1"
+    assert store.get_orders()[0]["items"] == ["فلافل"]
+
+def test_plain_reply_waits_for_commit(monkeypatch, store):
+    use_replies(monkeypatch, "رد")
+    result = chat_agent.run_agent("u", "سؤال", commit=False)
+    assert store.load("u") == ([], 0)
+
+    chat_agent.commit_turn("u", result)
+    assert len(store.load("u")[0]) == 2
+
+def test_cancelled_turn_closes_llm_stream(monkeypatch, store):
+    events = []
+    turn = start_turn("u")
+
+    class RecordingChatModel(GenericFakeChatModel):
+        def _stream(self, *args, **kwargs):
+            try:
+                for chunk in super()._stream(*args, **kwargs):
+                    events.append("chunk")
+                    yield chunk
+                    turn.cancel()  # Caller barges in after the first chunk
+            finally:
+                events.append("closed")
+
+    model = RecordingChatModel(messages=iter([AIMessage(content="one two three four five")]))
+    monkeypatch.setattr(chat_agent, "llm", model)
+
+    with pytest.raises(TurnCancelled):
+        chat_agent.run_agent("u", "hello", turn)
+    assert events == ["chunk", "chunk", "closed"]
+    assert store.load("u") == ([], 0)
+
+def test_commit_turn_refuses_turn_superseded_locally(monkeypatch, store):
+    use_replies(monkeypatch, "unheard reply")
+    turn = start_turn("u")
+    result = chat_agent.run_agent("u", "hello", turn, commit=False)
+
+    start_turn("u")
+    with pytest.raises(TurnCancelled):
+        chat_agent.commit_turn("u", result, turn)
+    assert store.load("u") == ([], 0)
+
+def test_commit_turn_refuses_turn_superseded_on_another_worker(monkeypatch, store):
+    use_replies(monkeypatch, "unheard reply")
+    turn = start_turn("u")
+    result = chat_agent.run_agent("u", "hello", turn, commit=False)
+
+    # The local Event is never set; only the store knows about the new turn
+    store.set_active_turn("u", "other-worker-turn")
+    with pytest.raises(TurnCancelled):
+        chat_agent.commit_turn("u", result, turn)
+    assert store.load("u") == ([], 0)
@@ -0,0 +1,105 @@
+# tests/test_session_store.py
+import pytest
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage
+from session_store import (
+    SQLiteSessionStore, RedisSessionStore, StaleSessionError,
+    serialize_history, deserialize_history
+)
+
+
+class RacingRedis:
+    """Redis stand-in where another worker saves the session right after the version read"""
+
+    def __init__(self, client, race):
+        self.client = client
+        self.race = race
+
+    def pipeline(self):
+        pipe = self.client.pipeline()
+        hmget = pipe.hmget
+
+        def racing_hmget(*args):
+            value = hmget(*args)
+            self.race()
+            return value
+
+        pipe.hmget = racing_hmget
+        return pipe
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisSessionStore(client=fakeredis.FakeRedis())
+
+
+def test_history_round_trip():
+    history = [HumanMessage(content="بدي شاورما"), AIMessageChunk(content="أكيد")]
+    restored = deserialize_history(serialize_history(history))
+    assert [type(message) for message in restored] == [HumanMessage, AIMessage]
+    assert [message.content for message in restored] == ["بدي شاورما", "أكيد"]
+
+def test_unsupported_message_type_is_rejected():
+    with pytest.raises(ValueError, match="ToolMessage"):
+        serialize_history([ToolMessage(content="x", tool_call_id="1")])
+
+def test_save_and_load(store):
+    assert store.load("u") == ([], 0)
+    assert store.save("u", [HumanMessage(content="hi")], 0) == 1
+    history, version = store.load("u")
+    assert [message.content for message in history] == ["hi"]
+    assert version == 1
+
+def test_stale_save_is_rejected(store):
+    store.save("u", [HumanMessage(content="first")], 0)
+    with pytest.raises(StaleSessionError):
+        store.save("u", [HumanMessage(content="second")], 0)
+    assert store.load("u")[0][0].content == "first"
+
+def test_clear_bumps_version(store):
+    store.save("u", [HumanMessage(content="hi")], 0)
+    store.clear("u")
+    assert store.load("u") == ([], 2)
+    with pytest.raises(StaleSessionError):
+        store.save("u", [HumanMessage(content="late")], 1)
+
+def test_save_requires_active_turn(store):
+    store.set_active_turn("u", "turn-1")
+    assert store.load("u") == ([], 0)
+    store.set_active_turn("u", "turn-2")
+    assert store.get_active_turn("u") == "turn-2"
+    with pytest.raises(StaleSessionError):
+        store.save("u", [HumanMessage(content="old turn")], 0, "turn-1")
+    assert store.save("u", [HumanMessage(content="new turn")], 0, "turn-2") == 1
+
+def test_interrupted_session_rejects_every_turn(store):
+    store.set_active_turn("u", "turn-1")
+    store.set_active_turn("u", None)
+    assert store.get_active_turn("u") is None
+    with pytest.raises(StaleSessionError):
+        store.save("u", [HumanMessage(content="late")], 0, "turn-1")
+
+def test_orders_are_shared(store):
+    store.append_order({"name": "أحمد", "items": ["فلافل"]})
+    assert store.get_orders() == [{"name": "أحمد", "items": ["فلافل"]}]
+
+def test_counters_accumulate(store):
+    store.increment_counter("cancelled:llm")
+    store.increment_counter("cancelled:llm", 2)
+    assert store.get_counters() == {"cancelled:llm": 3}
+
+def test_redis_watch_conflict_is_stale():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    other_worker = RedisSessionStore(client=client)
+    other_worker.save("u", [HumanMessage(content="first")], 0)
+
+    store = RedisSessionStore(client=RacingRedis(client, lambda: other_worker.clear("u")))
+    with pytest.raises(StaleSessionError):
+        store.save("u", [HumanMessage(content="second")], 1)
+    assert store.load("u") == ([], 2)
@@ -0,0 +1,72 @@
+# tests/test_turn_control.py
+import pytest
+import turn_control
+from session_store import SQLiteSessionStore
+from turn_control import (
+    TurnCancelled, start_turn, interrupt_turn, finish_turn, check_turn, get_cancel_stats
+)
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(turn_control, "get_session_store", lambda: store)
+    monkeypatch.setattr(turn_control, "active_turns", {})
+    return store
+
+
+def test_new_turn_cancels_previous_turn():
+    first = start_turn("u")
+    second = start_turn("u")
+    with pytest.raises(TurnCancelled):
+        check_turn(first, "llm")
+    check_turn(second, "llm")
+    finish_turn(first)
+    finish_turn(second)
+    assert turn_control.active_turns == {}
+
+def test_sessions_do_not_cancel_each_other():
+    first = start_turn("caller-a")
+    start_turn("caller-b")
+    check_turn(first, "llm", force=True)
+
+def test_turn_started_on_another_worker_cancels(store):
+    turn = start_turn("u")
+    # Another worker takes over the session; this process never sees its Turn
+    store.set_active_turn("u", "other-worker-turn")
+    check_turn(turn, "llm")  # Store is only polled once per turn_poll_interval
+    with pytest.raises(TurnCancelled):
+        check_turn(turn, "llm", force=True)
+
+def test_interrupt_cancels_without_new_turn(store):
+    turn = start_turn("u")
+    interrupt_turn("u")
+    with pytest.raises(TurnCancelled):
+        check_turn(turn, "text_to_speech")
+    assert store.get_active_turn("u") is None
+
+def test_only_abandoned_work_is_counted():
+    finished = start_turn("u")
+    check_turn(finished, "text_to_speech")
+    # Superseded after its last check point: nothing was abandoned
+    cancelled = start_turn("u")
+    finish_turn(finished)
+    start_turn("u")
+    with pytest.raises(TurnCancelled):
+        check_turn(cancelled, "llm")
+
+    stats = get_cancel_stats()
+    assert stats["turns"] == 1
+    assert stats["llm"] == 1
+    assert stats["text_to_speech"] == 0
+
+def test_counters_cover_all_workers(store, tmp_path, monkeypatch):
+    turn = start_turn("u")
+    store.set_active_turn("u", "other-worker-turn")
+    with pytest.raises(TurnCancelled):
+        check_turn(turn, "history", force=True)
+
+    # Another worker opening the same shared store sees the count
+    other_worker_store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(turn_control, "get_session_store", lambda: other_worker_store)
+    assert get_cancel_stats()["history"] == 1
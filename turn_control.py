@@ -0,0 +1,107 @@
+# turn_control.py
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from config import SESSION_STORE_CONFIG
+from session_store import get_session_store
+
+# Counters for work abandoned because the caller started a new turn. They
+# live in the session store so the totals cover every worker.
+CANCEL_COUNTERS = {
+    "turns": "🔁 أدوار ملغاة",
+    "speech_to_text": "🎤 نصوص صوتية مهملة",
+    "llm": "🧠 ردود Gemini مقطوعة",
+    "history": "📝 إضافات للمحادثة ملغاة",
+    "text_to_speech": "🔊 ردود ElevenLabs مقطوعة"
+}
+COUNTER_PREFIX = "cancelled:"
+
+# Turns running in this process; the session store is the source of truth
+# across workers, this registry only lets a local barge-in cancel instantly
+active_turns: Dict[str, "Turn"] = {}
+turns_lock = threading.Lock()
+
+
+class TurnCancelled(Exception):
+    """Raised inside a pipeline stage when its turn was superseded"""
+
+
+class Turn:
+    """One caller turn; cancelled as soon as the same session sends a new input"""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.turn_id = uuid.uuid4().hex
+        self.cancelled = threading.Event()
+        self.last_checked = time.monotonic()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled.is_set()
+
+
+def replace_local_turn(user_id: str, turn: Optional[Turn]):
+    """Cancel the session's turn running in this process and register turn instead"""
+    with turns_lock:
+        previous = active_turns.pop(user_id, None)
+        if previous is not None:
+            previous.cancel()
+        if turn is not None:
+            active_turns[user_id] = turn
+
+def start_turn(user_id: str) -> Turn:
+    """Register a new turn for a session, cancelling the one still in flight on any worker"""
+    turn = Turn(user_id)
+    replace_local_turn(user_id, turn)
+    get_session_store().set_active_turn(user_id, turn.turn_id)
+    return turn
+
+def interrupt_turn(user_id: str):
+    """Cancel a session's in-flight turn without starting a new one"""
+    replace_local_turn(user_id, None)
+    get_session_store().set_active_turn(user_id, None)
+
+def finish_turn(turn: Turn):
+    """Unregister a turn once its pipeline is done"""
+    with turns_lock:
+        if active_turns.get(turn.user_id) is turn:
+            del active_turns[turn.user_id]
+
+def check_turn(turn: Optional[Turn], stage: str, force: bool = False):
+    """Abort the current stage if its turn was cancelled; no-op without a turn.
+
+    The in-process Event is checked on every call. The session store, which
+    sees barge-ins handled by other workers, is polled at most once per
+    ``turn_poll_interval`` seconds unless ``force`` is set.
+    """
+    if turn is None:
+        return
+    if not turn.is_cancelled():
+        now = time.monotonic()
+        if force or now - turn.last_checked >= SESSION_STORE_CONFIG["turn_poll_interval"]:
+            turn.last_checked = now
+            if get_session_store().get_active_turn(turn.user_id) != turn.turn_id:
+                turn.cancel()
+    if turn.is_cancelled():
+        # Counted here, where work is actually abandoned, so a turn that was
+        # superseded after its last check point does not inflate the totals
+        store = get_session_store()
+        store.increment_counter(COUNTER_PREFIX + "turns")
+        store.increment_counter(COUNTER_PREFIX + stage)
+        raise TurnCancelled(f"Turn for {turn.user_id} cancelled during {stage}")
+
+def get_cancel_stats() -> Dict[str, int]:
+    """Return the cancellation counters summed over all workers"""
+    counters = get_session_store().get_counters()
+    return {name: counters.get(COUNTER_PREFIX + name, 0) for name in CANCEL_COUNTERS}
+
+def get_cancel_report() -> str:
+    """Get formatted cancellation counters"""
+    stats = get_cancel_stats()
+    report = "📊 **الأعمال الملغاة بسبب المقاطعة:**\n\n"
+    for name, label in CANCEL_COUNTERS.items():
+        report += f"{label}: {stats[name]}\n"
+    return report